@@ -3,6 +3,8 @@
 
 from StrategicAssetAllocation import Bootstrap, WriteToExcel
 from pandas import read_csv, Timestamp
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
 
 def Main() -> None:
     """Main function
@@ -18,8 +20,9 @@ def Main() -> None:
     NoIter = 10 # Number of bootstrap iterations
     Returns = read_csv('Returns.txt') # Read in return history
     Returns['Date'] = Returns['Date'].astype('datetime64[ns]')
-    # Calculate asset allocation
-    Allocation = Bootstrap(Returns, Fee, RebalancePeriod, ReturnHurdle, NoIter)
+    # Calculate asset allocation on one pool of worker processes kept for the whole run
+    with ProcessPoolExecutor(max_workers = cpu_count()) as Pool:
+        Allocation = Bootstrap(Returns, Fee, RebalancePeriod, ReturnHurdle, NoIter, Pool = Pool)
     # Write results to Excel
     Today = str(Timestamp('today'))[0:10].replace('-', '')
     FileName = f'Strategic Allocation {Today}.xlsx'
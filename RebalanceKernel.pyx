@@ -0,0 +1,72 @@
+# cython: language_level = 3
+# Compiled rebalance kernel
+# Imaad Davies
+
+cimport cython
+from libc.stdlib cimport malloc, free
+from libc.math cimport fabs
+
+ctypedef fused Real:
+    float
+    double
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef double Frequency(const Real[:, ::1] R, const double[:] WTarget, double Fee, Py_ssize_t RebalancePeriod,
+                       double ReturnHurdle):
+    """Frequency of outperformance of a portfolio rebalanced through time
+
+    Args:
+        R: ndarray
+        :Matrix of asset returns (days x assets)
+        WTarget: ndarray
+        :Target weights
+        Fee: float
+        :Brokerage fee
+        RebalancePeriod: int
+        :Number of days before rebalancing back to target weights
+        ReturnHurdle: float
+        :Return hurdle
+    Returns:
+        Freq: float
+        :Frequency of outperformance"""
+    cdef Py_ssize_t NoDataPts = R.shape[0]
+    cdef Py_ssize_t NoAssets = R.shape[1]
+    cdef Py_ssize_t Idx, Asset, Start, End
+    cdef Py_ssize_t NoOutperform = 0
+    cdef double FTotalIn = 100.0
+    cdef double FTotalOut, WIn, WeightChange
+    cdef double OneMinusFee = 1 - Fee
+    cdef double* FIn
+    if RebalancePeriod < 1:
+        raise ValueError('RebalancePeriod must be at least one day')
+    FIn = <double*> malloc(NoAssets * sizeof(double))
+    if FIn == NULL:
+        raise MemoryError()
+    try:
+        for Asset in range(NoAssets):
+            FIn[Asset] = WTarget[Asset] * FTotalIn
+        # Same segments as PortfolioRebalance: rebalance at the start of days RebalancePeriod - 1,
+        # 2 * RebalancePeriod - 1, ... and compound in between
+        Start = 0
+        End = min(RebalancePeriod - 1, NoDataPts)
+        while Start < NoDataPts:
+            if Start > 0:
+                for Asset in range(NoAssets):
+                    WIn = FIn[Asset] / FTotalIn
+                    WeightChange = WTarget[Asset] - WIn
+                    FIn[Asset] = FTotalIn * (WIn + OneMinusFee * WeightChange - Fee * fabs(WeightChange))
+            for Idx in range(Start, End):
+                FTotalOut = 0.0
+                for Asset in range(NoAssets):
+                    FIn[Asset] *= 1.0 + <double> R[Idx, Asset]
+                    FTotalOut += FIn[Asset]
+                if FTotalOut / FTotalIn - 1 > ReturnHurdle:
+                    NoOutperform += 1
+                FTotalIn = FTotalOut
+            Start = End
+            End = min(Start + RebalancePeriod, NoDataPts)
+    finally:
+        free(FIn)
+    return <double> NoOutperform / NoDataPts
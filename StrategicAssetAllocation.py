@@ -1,63 +1,124 @@
 # Rebalance tool
 # Imaad Davies
 
-from numpy import ndarray, array, concatenate, zeros, ones, random
-from pandas import DataFrame, Timestamp, ExcelWriter
-from scipy.optimize import minimize
+from numpy import ndarray, absolute, ascontiguousarray, concatenate, empty, exp, float32, zeros, ones, random
+from pandas import DataFrame, ExcelWriter
+from scipy.optimize import minimize, differential_evolution, Bounds, LinearConstraint
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from functools import partial
+from os import cpu_count
+from typing import Callable, Union
+try:
+    from numba import njit
+except ImportError:
+    def njit(*Args, **Kwargs):
+        """Fallback when numba is not installed: kernels run as plain Python"""
+        if len(Args) == 1 and callable(Args[0]):
+            return Args[0]
+        return lambda Func: Func
+try:
+    from RebalanceKernel import Frequency
+except ImportError:
+    Frequency = None
 
-def RebalanceTool(FTotalIn : float, WIn : ndarray, WTarget : ndarray, Fee : float, 
-                  Return : ndarray) -> ndarray:
+# Optimisation methods understood by CalcWeights
+Methods = ('COBYLA', 'SLSQP', 'Dirichlet', 'DifferentialEvolution')
+
+@njit(inline = 'always')
+def RebalanceTool(FIn : ndarray, FTotalIn : float, WTarget : ndarray, Fee : float) -> None:
     """Rebalance portfolio to target weights
     
     Args:
+        FIn: ndarray
+        :Instrument values, replaced in place by their values after trading
         FTotalIn: float
         :Portfolio starting value
-        WIn: ndarray
-        :Starting weights
         WTarget: ndarray
         :Target weights
         Fee: float
         :Brokerage fee
-        Return: float
-        :Asset return
     Returns:
-        FOut: ndarray
-        :Instrument end values"""
-    WeightChange = (WTarget - WIn)
-    TradeValue = (1 - Fee) * WeightChange
-    Brokerage = Fee * abs(WeightChange)
-    FOut = FTotalIn * (WIn + TradeValue - Brokerage) * (1 + Return)
-    return FOut
+        None"""
+    OneMinusFee = 1 - Fee
+    for Asset in range(FIn.shape[0]):
+        WIn = FIn[Asset] / FTotalIn
+        WeightChange = WTarget[Asset] - WIn
+        FIn[Asset] = FTotalIn * (WIn + OneMinusFee * WeightChange - Fee * abs(WeightChange))
 
-def CreateResultsDataFrame(Returns : DataFrame) -> DataFrame:
-    """Creates a DataFrame to store results
+@njit(inline = 'always')
+def CompoundSegment(FIn : ndarray, FTotalIn : float, R : ndarray, Start : int, End : int, 
+                    PortReturns : ndarray) -> float:
+    """Compound instrument values over consecutive days without rebalancing
     
     Args:
-        Returns: DataFrame
-        :DataFrame of asset returns
+        FIn: ndarray
+        :Instrument starting values, updated in place
+        FTotalIn: float
+        :Portfolio value at the close of the previous day
+        R: ndarray
+        :Matrix of asset returns (days x assets)
+        Start: int
+        :First day of the segment
+        End: int
+        :Day after the last day of the segment
+        PortReturns: ndarray
+        :Daily portfolio returns, filled in for the segment
     Returns:
-        Results: DataFrame
-        :DataFrame to store results"""
-    Columns = list(Returns.columns)
-    Assets = list(Returns.columns[1:])
-    Columns += ['Total', 'Return', 'Benchmark']
-    NoAssets = len(Assets)
-    Dtypes = ['datetime64[ns]'] + ['float64'] * (NoAssets + 3) 
-    Results = DataFrame({Column : [] for Column in Columns})
-    Results = Results.astype(dtype = {Column : Dtype for Column, Dtype in zip(Columns, Dtypes)})
-    return Results
+        FTotalOut: float
+        :Portfolio end value"""
+    for Idx in range(Start, End):
+        FTotalOut = 0.0
+        for Asset in range(FIn.shape[0]):
+            FIn[Asset] *= 1 + R[Idx, Asset]
+            FTotalOut += FIn[Asset]
+        PortReturns[Idx] = FTotalOut / FTotalIn - 1
+        FTotalIn = FTotalOut
+    return FTotalIn
 
-def PortfolioRebalance(WTarget : ndarray, Returns : DataFrame, Results : DataFrame, Fee : float, 
-                       RebalancePeriod : int, ReturnHurdle : float) -> DataFrame:
+# Returns are simulated in single precision to halve the memory traffic of the kernel, with
+# a double precision variant kept for callers that supply float64 histories
+@njit(['float64[::1](float64[:], float32[:, ::1], float64, int64)', 
+       'float64[::1](float64[:], float64[:, ::1], float64, int64)'], cache = True, fastmath = True, nogil = True)
+def PortfolioRebalance(WTarget : ndarray, R : ndarray, Fee : float, RebalancePeriod : int) -> ndarray:
     """Simulation of portfolio rebalancing through time
     
     Args:
         WTarget: ndarray
         :Target weights
-        Returns: DataFrame
-        :DataFrame of asset returns
-        Results: DataFrame
-        :DataFrame to store results
+        R: ndarray
+        :Matrix of asset returns (days x assets)
+        Fee: float
+        :Brokerage fee
+        RebalancePeriod: int
+        :Number of days before rebalancing back to target weights
+    Returns:
+        PortReturns: ndarray
+        :Daily portfolio returns"""
+    NoDataPts = R.shape[0]
+    PortReturns = empty(NoDataPts)
+    FTotalIn = 100.0
+    FIn = WTarget * FTotalIn
+    # Rebalancing happens at the start of days RebalancePeriod - 1, 2 * RebalancePeriod - 1, ... so
+    # the history splits into segments of one rebalance followed by pure compounding. Both steps
+    # update FIn in place, so the only state carried between segments is FIn and FTotalIn
+    FTotalIn = CompoundSegment(FIn, FTotalIn, R, 0, min(RebalancePeriod - 1, NoDataPts), PortReturns)
+    for Start in range(RebalancePeriod - 1, NoDataPts, RebalancePeriod):
+        RebalanceTool(FIn, FTotalIn, WTarget, Fee)
+        End = min(Start + RebalancePeriod, NoDataPts)
+        FTotalIn = CompoundSegment(FIn, FTotalIn, R, Start, End, PortReturns)
+    return PortReturns
+
+@njit(cache = True, fastmath = True, nogil = True)
+def BatchFrequency(WCandidates : ndarray, R : ndarray, Fee : float, RebalancePeriod : int, 
+                   ReturnHurdle : float) -> ndarray:
+    """Frequency of outperformance for many candidate target weights in one call
+    
+    Args:
+        WCandidates: ndarray
+        :Candidate target weights (candidates x assets)
+        R: ndarray
+        :Matrix of asset returns (days x assets)
         Fee: float
         :Brokerage fee
         RebalancePeriod: int
@@ -65,40 +126,24 @@ def PortfolioRebalance(WTarget : ndarray, Returns : DataFrame, Results : DataFra
         ReturnHurdle: float
         :Return hurdle
     Returns:
-        Results: DataFrame
-        :DataFrame to store results"""
-    FTotalIn = 100
-    FIn = WTarget * FTotalIn
-    WIn = FIn / FTotalIn
-    Assets = list(Returns.columns[1:])
-    Columns = list(Results.columns)
-    for Idx in Returns.index:
-        Return = Returns.loc[Idx, Assets].values
-        if (Idx + 1) % RebalancePeriod == 0:
-            FOut = RebalanceTool(FTotalIn, WIn, WTarget, Fee, Return)
-        else:
-            FOut = RebalanceTool(FTotalIn, WIn, WIn, Fee, Return)
-        FTotalOut = sum(FOut)
-        PortfolioReturn = FTotalOut / FTotalIn - 1
-        FIn = FOut
-        FTotalIn = FTotalOut
-        WIn = FIn / FTotalIn
-        Date = Timestamp(Returns.loc[Idx, 'Date'])
-        Values = concatenate(([Date], FIn, [FTotalOut, PortfolioReturn, ReturnHurdle]))
-        Results.loc[Idx, Columns] = Values
-    return Results
+        Freq: ndarray
+        :Frequency of outperformance of each candidate"""
+    NoCandidates = WCandidates.shape[0]
+    Freq = empty(NoCandidates)
+    for Idx in range(NoCandidates):
+        PortReturns = PortfolioRebalance(WCandidates[Idx], R, Fee, RebalancePeriod)
+        Freq[Idx] = (PortReturns > ReturnHurdle).sum() / PortReturns.shape[0]
+    return Freq
 
-def Objective(WTarget : ndarray, Returns : DataFrame, Results : DataFrame, Fee : float, 
-              RebalancePeriod : int, ReturnHurdle : float) -> float:
+def Objective(WTarget : ndarray, R : ndarray, Fee : float, RebalancePeriod : int, 
+              ReturnHurdle : float) -> float:
     """Calculate target weights
     
         Args:
         WTarget: ndarray
         :Target weights
-        Returns: DataFrame
-        :DataFrame of asset returns
-        Results: DataFrame
-        :DataFrame to store results
+        R: ndarray
+        :Matrix of asset returns (days x assets)
         Fee: float
         :Brokerage fee
         RebalancePeriod: int
@@ -108,62 +153,232 @@ def Objective(WTarget : ndarray, Returns : DataFrame, Results : DataFrame, Fee :
     Returns:
         Freq: float
         :Frequency of outperformance"""
-    Results = PortfolioRebalance(WTarget, Returns, Results, Fee, RebalancePeriod, ReturnHurdle)
-    NoDataPts = len(Results.index)
-    Freq = (Results['Return'] > Results['Benchmark']).sum() / NoDataPts
-    return Freq * -1
+    # Prefer the ahead-of-time compiled kernel from setup.py when it has been built
+    if Frequency is not None:
+        return Frequency(R, WTarget, Fee, RebalancePeriod, ReturnHurdle) * -1
+    PortReturns = PortfolioRebalance(WTarget, R, Fee, RebalancePeriod)
+    return -(PortReturns > ReturnHurdle).mean()
 
-def Constraints(WTarget : ndarray, LBound : ndarray, UBound : ndarray) -> ndarray:
-    """Optimisation problem constraints
+def ScaledObjective(W : ndarray, R : ndarray, Fee : float, RebalancePeriod : int, 
+                    ReturnHurdle : float) -> float:
+    """Objective for unnormalised weights, rescaled to sum to one
+    
+    Args:
+        W: ndarray
+        :Unnormalised target weights
+        R: ndarray
+        :Matrix of asset returns (days x assets)
+        Fee: float
+        :Brokerage fee
+        RebalancePeriod: int
+        :Number of days before rebalancing back to target weights
+        ReturnHurdle: float
+        :Return hurdle
+    Returns:
+        Freq: float
+        :Frequency of outperformance"""
+    return Objective(W / W.sum(), R, Fee, RebalancePeriod, ReturnHurdle)
+
+@njit(cache = True, fastmath = True, nogil = True)
+def PortfolioRebalanceGradient(WTarget : ndarray, R : ndarray, Fee : float, 
+                               RebalancePeriod : int) -> tuple:
+    """Simulation of portfolio rebalancing through time with sensitivities to the target weights
     
     Args:
         WTarget: ndarray
         :Target weights
-        LBound: ndarray
-        :Lower bound
-        UBound: ndarray
-        :Upper bound
+        R: ndarray
+        :Matrix of asset returns (days x assets)
+        Fee: float
+        :Brokerage fee
+        RebalancePeriod: int
+        :Number of days before rebalancing back to target weights
     Returns:
-        AllConstraints: ndarray
-        :Optimisation problem constraints"""
-    # Equality constraints
-    Constraint1 = sum(WTarget) - 1
-    Constraint2 = - Constraint1
-    EqualityConstraints = array([Constraint1, Constraint2])
-    # Inequality constraints
-    Constraint3 = UBound - WTarget
-    Constraint4 = WTarget - LBound
-    InequalityConstraints = concatenate((Constraint3, Constraint4))
-    # Combine equality and inequality constraints
-    AllConstraints = concatenate((EqualityConstraints, InequalityConstraints))
-    return AllConstraints
+        PortReturns: ndarray
+        :Daily portfolio returns
+        Jacobian: ndarray
+        :Derivative of each daily portfolio return with respect to each target weight"""
+    NoDataPts, NoAssets = R.shape
+    PortReturns = empty(NoDataPts)
+    Jacobian = empty((NoDataPts, NoAssets))
+    FTotalIn = 100.0
+    FIn = WTarget * FTotalIn
+    # DFIn[I, J] is the derivative of instrument value I with respect to target weight J
+    DFIn = zeros((NoAssets, NoAssets))
+    for I in range(NoAssets):
+        DFIn[I, I] = FTotalIn
+    # The starting portfolio value is fixed regardless of the target weights
+    DFTotalIn = zeros(NoAssets)
+    DFTotalOut = empty(NoAssets)
+    OneMinusFee = 1 - Fee
+    # Same segments as PortfolioRebalance: each one opens with a trade back to the target weights,
+    # except the first, and every other day purely compounds
+    Start = 0
+    End = min(RebalancePeriod - 1, NoDataPts)
+    while Start < NoDataPts:
+        if Start > 0:
+            # Post-trade value is FIn + (1 - Fee) * Trade - Fee * |Trade| per instrument
+            Trade = FTotalIn * WTarget - FIn
+            for I in range(NoAssets):
+                Slope = OneMinusFee - Fee if Trade[I] >= 0 else 1.0
+                for J in range(NoAssets):
+                    DTrade = WTarget[I] * DFTotalIn[J] - DFIn[I, J]
+                    if I == J:
+                        DTrade += FTotalIn
+                    DFIn[I, J] += Slope * DTrade
+            FIn = FIn + OneMinusFee * Trade - Fee * absolute(Trade)
+        for Idx in range(Start, End):
+            # Values, sensitivities and their totals compound in preallocated buffers, so compounding
+            # days allocate nothing
+            FTotalOut = 0.0
+            DFTotalOut[:] = 0.0
+            for I in range(NoAssets):
+                Growth = 1 + R[Idx, I]
+                FIn[I] *= Growth
+                FTotalOut += FIn[I]
+                for J in range(NoAssets):
+                    DFIn[I, J] *= Growth
+                    DFTotalOut[J] += DFIn[I, J]
+            PortReturns[Idx] = FTotalOut / FTotalIn - 1
+            for J in range(NoAssets):
+                Jacobian[Idx, J] = (DFTotalOut[J] * FTotalIn - FTotalOut * DFTotalIn[J]) / FTotalIn ** 2
+                DFTotalIn[J] = DFTotalOut[J]
+            FTotalIn = FTotalOut
+        Start = End
+        End = min(Start + RebalancePeriod, NoDataPts)
+    return PortReturns, Jacobian
 
-def CalcWeights(Returns : DataFrame, Fee : float, RebalancePeriod : int, ReturnHurdle : float) -> ndarray:
+def SmoothObjective(WTarget : ndarray, R : ndarray, Fee : float, RebalancePeriod : int, 
+                    ReturnHurdle : float, Sharpness : float) -> tuple:
+    """Differentiable approximation of the objective and its gradient
+    
+    Args:
+        WTarget: ndarray
+        :Target weights
+        R: ndarray
+        :Matrix of asset returns (days x assets)
+        Fee: float
+        :Brokerage fee
+        RebalancePeriod: int
+        :Number of days before rebalancing back to target weights
+        ReturnHurdle: float
+        :Return hurdle
+        Sharpness: float
+        :Steepness of the sigmoid replacing the outperformance indicator
+    Returns:
+        Freq: float
+        :Smoothed frequency of outperformance
+        Grad: ndarray
+        :Gradient of the smoothed frequency with respect to the target weights"""
+    PortReturns, Jacobian = PortfolioRebalanceGradient(WTarget, R, Fee, RebalancePeriod)
+    Prob = 1 / (1 + exp(-Sharpness * (PortReturns - ReturnHurdle)))
+    Freq = Prob.mean()
+    Grad = (Sharpness * Prob * (1 - Prob)) @ Jacobian / len(PortReturns)
+    return Freq * -1, Grad * -1
+
+def CalcWeights(R : ndarray, Fee : float, RebalancePeriod : int, ReturnHurdle : float, 
+                Method : str = 'COBYLA', Rng : random.Generator = None, 
+                Workers : Union[int, Callable] = -1) -> ndarray:
     """Calculates the weight of capital to allocate to each asset
     
     Args:
-        Returns: DataFrame
-        :DataFrame of asset returns
+        R: ndarray
+        :Matrix of asset returns (days x assets)
         Fee: float
         RebalancePeriod: int
         ReturnHurdle: float
         :Return hurdle
+        Method: str
+        :'COBYLA' searches the exact objective, 'SLSQP' follows the gradient of a smoothed one, 
+        'Dirichlet' picks the best of a random sample of allocations and 'DifferentialEvolution' 
+        evolves a population of allocations evaluated in parallel
+        Rng: Generator
+        :Random number generator for sampling allocations, fresh entropy if None
+        Workers: int or map-like callable
+        :Parallel map for 'DifferentialEvolution', -1 for a pool over all cores
     Returns:
         Output: ndarray
         :Array containing asset weights and objective function value"""
-    Assets = list(Returns.columns[1:])
-    Results = CreateResultsDataFrame(Returns)
-    NoAssets = len(Assets)
-    LBound = zeros(NoAssets)
-    UBound = ones(NoAssets)
-    ConstraintInput = {'type': 'ineq', 'fun': Constraints, 'args': (LBound, UBound, )}
-    Args = (Returns, Results, Fee, RebalancePeriod, ReturnHurdle, )
+    # The segment walks in the compiled kernels never terminate without a positive period
+    if RebalancePeriod < 1:
+        raise ValueError('RebalancePeriod must be at least one day')
+    # The compiled kernels expect row-major returns, while pandas hands back column-major data
+    R = ascontiguousarray(R)
+    NoAssets = R.shape[1]
+    WeightBounds = Bounds(zeros(NoAssets), ones(NoAssets))
+    Budget = LinearConstraint(ones(NoAssets), 1, 1)
+    Args = (R, Fee, RebalancePeriod, ReturnHurdle, )
     WTargetGuess = 1 / NoAssets * ones(NoAssets)
-    Res = minimize(Objective, WTargetGuess, args = Args, method = 'COBYLA', constraints = ConstraintInput)
-    Output = concatenate((Res.x, [Res.fun * -100]))
+    if Method == 'Dirichlet':
+        # Score a uniform sample of the weight simplex in one batch rather than searching sequentially
+        NoCandidates = 10000
+        Rng = random.default_rng() if Rng is None else Rng
+        WCandidates = Rng.dirichlet(ones(NoAssets), size = NoCandidates)
+        Freq = BatchFrequency(WCandidates, *Args)
+        WTarget = WCandidates[Freq.argmax()]
+        return concatenate((WTarget, [Freq.max() * 100]))
+    if Method == 'DifferentialEvolution':
+        # Random trial vectors never satisfy the budget exactly, so search the unit box and rescale
+        Res = differential_evolution(ScaledObjective, WeightBounds, args = Args, maxiter = 50, polish = False, 
+                                     workers = Workers, updating = 'deferred', rng = Rng)
+        WTarget = Res.x / Res.x.sum()
+        return concatenate((WTarget, [Res.fun * -100]))
+    if Method == 'SLSQP':
+        Sharpness = 1e3 # Sigmoid steepness, a transition width of a few tenths of a percent of daily return
+        Res = minimize(SmoothObjective, WTargetGuess, args = Args + (Sharpness, ), method = 'SLSQP', jac = True, 
+                       bounds = WeightBounds, constraints = Budget)
+    elif Method == 'COBYLA':
+        # The objective only moves in steps of 1 / NoDataPts, so finer searching chases noise. Start
+        # with steps on the scale of one asset's share and stop once they shrink to a percent of weight
+        NoDataPts = R.shape[0]
+        Options = {'rhobeg': 1 / NoAssets, 'tol': 1e-2, 'maxiter': 100, 'catol': 1 / NoDataPts}
+        Res = minimize(Objective, WTargetGuess, args = Args, method = 'COBYLA', bounds = WeightBounds, 
+                       constraints = Budget, options = Options)
+    else:
+        raise ValueError(f'Unknown method {Method}')
+    # Report the exact frequency of outperformance whichever objective was searched
+    Output = concatenate((Res.x, [Objective(Res.x, *Args) * -100]))
+    return Output
+
+def BootstrapIteration(Seed : random.SeedSequence, ShmName : str, Shape : tuple, Dtype : str, Fee : float, 
+                       RebalancePeriod : int, ReturnHurdle : float, Method : str, 
+                       Workers : Union[int, Callable] = -1) -> ndarray:
+    """Resample return history once and calculate weights on the resampled history
+    
+    Args:
+        Seed: SeedSequence
+        :Independent seed for this iteration's random number generator
+        ShmName: str
+        :Name of the shared memory block holding the matrix of asset returns (days x assets)
+        Shape: tuple
+        :Shape of the matrix of asset returns
+        Dtype: str
+        :Data type of the matrix of asset returns
+        Fee: float
+        RebalancePeriod: int
+        ReturnHurdle: float
+        :Return hurdle
+        Method: str
+        :Optimisation method passed to CalcWeights
+        Workers: int or map-like callable
+        :Parallel map passed to CalcWeights
+    Returns:
+        Output: ndarray
+        :Array containing asset weights and objective function value"""
+    NoDataPts = Shape[0]
+    Rng = random.default_rng(Seed)
+    Rnd = Rng.integers(low = 0, high = NoDataPts - 1, size = NoDataPts, endpoint = True)
+    # Attach to the published return matrix only long enough to copy out this resample
+    Shm = SharedMemory(name = ShmName)
+    try:
+        RndR = ndarray(Shape, dtype = Dtype, buffer = Shm.buf)[Rnd]
+    finally:
+        Shm.close()
+    Output = CalcWeights(RndR, Fee, RebalancePeriod, ReturnHurdle, Method, Rng, Workers)
     return Output
 
-def Bootstrap(Returns : DataFrame, Fee : float, RebalancePeriod : int, ReturnHurdle : float, NoIter : int) -> DataFrame:
+def Bootstrap(Returns : DataFrame, Fee : float, RebalancePeriod : int, ReturnHurdle : float, NoIter : int, 
+              Method : str = 'COBYLA', Seed : int = None, Pool : Executor = None) -> DataFrame:
     """Resample return history and generate more robust allocations
     
     Args:
@@ -175,20 +390,50 @@ def Bootstrap(Returns : DataFrame, Fee : float, RebalancePeriod : int, ReturnHur
         :Return hurdle
         NoIter: int
         :Number of iterations to do for resampling
+        Method: str
+        :Optimisation method passed to CalcWeights
+        Seed: int
+        :Seed for reproducible resampling, fresh entropy if None
+        Pool: Executor
+        :Process pool to run on, a temporary one over all cores if None
     Returns:
         Allocation: DataFrame
         :Asset allocation"""
-    NoDataPts = len(Returns.index)
+    # Reject bad arguments up front rather than after the pool and shared memory are set up
+    if Method not in Methods:
+        raise ValueError(f'Unknown method {Method}')
+    if RebalancePeriod < 1:
+        raise ValueError('RebalancePeriod must be at least one day')
+    if Pool is None:
+        with ProcessPoolExecutor(max_workers = cpu_count()) as Pool:
+            return Bootstrap(Returns, Fee, RebalancePeriod, ReturnHurdle, NoIter, Method, Seed, Pool)
     Assets = list(Returns.columns[1:])
-    IterationRes = DataFrame({Column : [] for Column in (Assets + ['Frequency'])})
-    for Idx in range(0, NoIter):
-        print(f'Iteration number: {Idx + 1}')
-        Rnd = random.default_rng().integers(low = 0, high = NoDataPts - 1, size = NoDataPts, endpoint = True)
-        RndReturns = Returns.copy().loc[Rnd, :]
-        RndReturns['Date'] = Returns['Date']
-        RndReturns.reset_index(drop = True, inplace = True)
-        Output = CalcWeights(RndReturns, Fee, RebalancePeriod, ReturnHurdle)
-        IterationRes.loc[Idx, :] = Output
+    # Dates play no part in the optimisation, so only the return matrix is resampled. Single
+    # precision is ample for daily returns and halves the bytes gathered per resample. pandas hands
+    # back column-major data, so force row-major to make each resampled day one contiguous block
+    R = ascontiguousarray(Returns[Assets].to_numpy(), dtype = float32)
+    # Iterations are independent, so run them across all cores. Each one gets a child of a single
+    # SeedSequence, giving non-overlapping random streams that are reproducible for a given Seed
+    Seeds = random.SeedSequence(Seed).spawn(NoIter)
+    # Publish the return matrix once in shared memory. Workers attach to it by name rather than
+    # receiving a pickled copy with every task
+    Shm = SharedMemory(create = True, size = R.nbytes)
+    try:
+        ndarray(R.shape, dtype = R.dtype, buffer = Shm.buf)[:] = R
+        # Each objective evaluation takes microseconds, so parallelism is only worthwhile across
+        # iterations and every optimiser runs serially inside its worker
+        Iteration = partial(BootstrapIteration, ShmName = Shm.name, Shape = R.shape, Dtype = R.dtype.str, Fee = Fee, 
+                            RebalancePeriod = RebalancePeriod, ReturnHurdle = ReturnHurdle, Method = Method, 
+                            Workers = 1)
+        Results = Pool.map(Iteration, Seeds)
+        Outputs = empty((NoIter, len(Assets) + 1))
+        for Idx, Output in enumerate(Results):
+            print(f'Iteration number: {Idx + 1}')
+            Outputs[Idx] = Output
+    finally:
+        Shm.close()
+        Shm.unlink()
+    IterationRes = DataFrame(Outputs, columns = Assets + ['Frequency'])
     Q50 = IterationRes['Frequency'].quantile(q = 0.5)
     WTarget = IterationRes[Assets][IterationRes['Frequency'] >= Q50].mean().values
     Allocation = DataFrame({'Asset': Assets, 'Weights (%)' : WTarget * 100}).set_index('Asset')
@@ -0,0 +1,10 @@
+# Build the compiled rebalance kernel in place with: python setup.py build_ext --inplace
+# Imaad Davies
+
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+Kernel = Extension('RebalanceKernel', ['RebalanceKernel.pyx'], 
+                   extra_compile_args = ['-O3', '-march=native', '-ffast-math'])
+
+setup(name = 'RebalanceKernel', ext_modules = cythonize([Kernel]))